@@ -6,49 +6,279 @@
 
 import os
 import json  # Import the json module
+from concurrent.futures import ThreadPoolExecutor
 
-def get_file_info(path, savelist):
+# extensions (without the leading dot) of the files that get listed
+_EXTENSIONS = frozenset({'json', 'nii', 'nii.gz', 'zip'})
+
+# POSIX lets us scan and stat relative to an open directory (openat/fstatat)
+_DIR_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0)
+_HAVE_DIR_FD = os.scandir in os.supports_fd and os.open in os.supports_dir_fd
+
+def _has_listed_extension(name):
+  """
+  This function checks a file name against _EXTENSIONS using its last one or two suffixes.
+
+  Args:
+      name: The file name (no directory part).
+
+  Returns:
+      True if the name ends in one of the listed extensions.
+  """
+  stem, dot, ext = name.rpartition('.')
+  if not dot:
+    return False
+  if ext in _EXTENSIONS:
+    return True
+  # double extensions such as .nii.gz
+  _, dot, ext2 = stem.rpartition('.')
+  return bool(dot) and f"{ext2}.{ext}" in _EXTENSIONS
+
+def _dir_size(path):
+  """
+  This function returns the total size in bytes of all files below a directory.
+
+  Args:
+      path: The directory to measure.
+
+  Returns:
+      The summed size of every file in the directory tree.
+  """
+  if _HAVE_DIR_FD:
+    return _dir_size_fd(path)
+  size = 0
+  stack = [path]
+  while stack:
+    try:
+      it = os.scandir(stack.pop())
+    except OSError:
+      # unreadable directories are skipped, as os.walk does
+      continue
+    with it:
+      for entry in it:
+        if entry.is_dir():
+          if not entry.is_symlink():
+            stack.append(entry.path)
+        else:
+          size += entry.stat().st_size
+  return size
+
+def _dir_size_fd(path):
+  """
+  This function is _dir_size using directory file descriptors, so every stat resolves a single name instead of the full path.
+
+  Args:
+      path: The directory to measure.
+
+  Returns:
+      The summed size of every file in the directory tree.
+  """
+  try:
+    fd = os.open(path, _DIR_FLAGS)
+  except OSError:
+    return 0
+  size = 0
+  # one (fd, iterator) frame per level of the current branch, so the number
+  # of open descriptors is bounded by the tree depth, not its width
+  stack = [(fd, os.scandir(fd))]
+  try:
+    while stack:
+      fd, it = stack[-1]
+      for entry in it:
+        if entry.is_dir():
+          if not entry.is_symlink():
+            try:
+              child = os.open(entry.name, _DIR_FLAGS, dir_fd=fd)
+            except OSError:
+              # unreadable directories are skipped, as os.walk does
+              continue
+            stack.append((child, os.scandir(child)))
+            break
+        else:
+          size += entry.stat().st_size
+      else:
+        stack.pop()
+        it.close()
+        os.close(fd)
+  finally:
+    for fd, it in stack:
+      it.close()
+      os.close(fd)
+  return size
+
+def _visit(root, rel, file_info, sized=False):
+  """
+  This function lists one directory, appending its entries to file_info.
+
+  Args:
+      root: The directory to list.
+      rel: The path of root relative to the top directory, with '/' separators ('' for the top itself).
+      file_info: The list the entries are appended to.
+      sized: If True, also add up the size of every file in the directory (listed or not).
+
+  Returns:
+      A tuple of the (path, relative path) pairs of the subdirectories still to descend into, in os.walk order, and the size in bytes counted (0 unless sized).
+  """
+  # os.scandir hands back DirEntry objects whose type and stat information
+  # is cached, so each entry costs at most one stat call
+  try:
+    it = os.scandir(root)
+  except OSError:
+    return [], 0
+  total = 0
+  dirs = []
+  files = []
+  with it:
+    for entry in it:
+      if entry.is_dir():
+        # Exclude 'code' directory completely
+        if entry.name != "code":
+          dirs.append(entry)
+        elif sized and not entry.is_symlink():
+          # not listed, but still part of an enclosing sourcedata directory
+          total += _dir_size(entry.path)
+      else:
+        files.append(entry)
+
+  # relative paths are built by concatenation, always with '/' separators
+  prefix = rel + "/" if rel else ""
+
+  # Process directories
+  # Only include directories within 'source'
+  in_sourcedata = root.endswith("sourcedata") and bool(dirs)
+  subtrees = []
+  if in_sourcedata:
+    # each subdirectory is walked once, adding up its size on the way; its
+    # entries are held back so they still come after the directory entries
+    # and the files of root, as in os.walk order
+    for directory in dirs:
+      if directory.is_symlink():
+        # listed with the size of its target, but not descended
+        size = _dir_size(directory.path)
+      else:
+        entries = []
+        size = _walk_sized(directory.path, prefix + directory.name, entries)
+        subtrees.append(entries)
+        total += size
+      file_info.append({"path": "sourcedata/" + directory.name, "contentbytesize": size})
+      
+  # Process files
+  for file in files:
+    # Include files with ".json" or ".nii[.gz]" or "zip" (from source) extensions
+    listed = _has_listed_extension(file.name)
+    if listed or sized:
+      size = file.stat().st_size
+      if sized:
+        total += size
+      if listed:
+        file_info.append({"path": prefix + file.name, "contentbytesize": size})
+
+  if in_sourcedata:
+    # the subdirectories have been walked already
+    for entries in subtrees:
+      file_info.extend(entries)
+    return [], total
+  # symlinked directories are not followed
+  return [(d.path, prefix + d.name) for d in dirs if not d.is_symlink()], total
+
+def _walk_sized(root, rel, file_info):
+  """
+  This function walks the tree below root like _iter_walk, appending the entries to file_info and adding up the size of every file on the way.
+
+  Args:
+      root: The directory to start from.
+      rel: The path of root relative to the top directory.
+      file_info: The list the entries are appended to.
+
+  Returns:
+      The total size in bytes of the files below root, as _dir_size would count it.
+  """
+  total = 0
+  stack = [(root, rel)]
+  while stack:
+    subdirs, size = _visit(*stack.pop(), file_info, sized=True)
+    total += size
+    stack.extend(reversed(subdirs))
+  return total
+
+def _iter_walk(root, rel):
+  """
+  This function walks the tree below root depth first, in os.walk order, yielding entries as each directory is listed.
+  The listing of a sourcedata directory is yielded in one go, once its subdirectory sizes are known.
+
+  Args:
+      root: The directory to start from.
+      rel: The path of root relative to the top directory ('' for the top itself).
+
+  Yields:
+      One dictionary per entry, as listed by get_file_info.
+  """
+  stack = [(root, rel)]
+  while stack:
+    entries = []
+    subdirs, _ = _visit(*stack.pop(), entries)
+    yield from entries
+    stack.extend(reversed(subdirs))
+
+def _walk(root, rel):
+  """
+  This function collects _iter_walk into a list, for use on the thread pool.
+
+  Args:
+      root: The directory to start from.
+      rel: The path of root relative to the top directory.
+
+  Returns:
+      The list of entries found below root.
+  """
+  return list(_iter_walk(root, rel))
+
+def iter_file_info(path):
+  """
+  This function is the streaming version of get_file_info: it yields the same entries in the same order without building the whole list.
+
+  Args:
+      path: The path to the directory to start searching from.
+
+  Yields:
+      One dictionary per file or sourcedata directory, with "path" and "contentbytesize" keys.
+  """
+  return _iter_walk(path, "")
+
+def get_file_info(path, savelist, workers=0):
   """
   This function walks through a directory structure and returns a list of dictionaries containing full path, file name, and size.
 
   Args:
       path: The path to the directory to start searching from.
+      savelist: If 1, also write the list to file_list.jsonl in path.
+      workers: If > 0, scan the top-level subdirectories on that many threads (same output, same order).
 
   Returns:
       A list of dictionaries, where each dictionary contains "full_path", "name", and "size" keys for each file and directory, excluding all files and directories within the 'source' and 'code' subdirectories.
   """
-  file_info = []
-  for root, dirs, files in os.walk(path):
-    # Exclude 'code' directory completely
-    if "code" in dirs:
-      dirs.remove("code")
-
-    # Process directories
-    for directory in dirs:
-      full_path = os.path.join(root, os.path.normpath(directory))
-      # Only include directories within 'source'
-      if root.endswith("sourcedata"):
-        size = sum(os.path.getsize(os.path.join(dirpath, filename)) 
-          for dirpath, _, filenames in os.walk(full_path) for filename in filenames)
-        dirname = os.path.join("sourcedata", os.path.normpath(directory))
-        file_info.append({"path": dirname, "contentbytesize": size})
-        
-    # Process files
-    for file in files:
-      full_path = os.path.join(root, file)
-      # Include files with ".json" or ".nii[.gz]" or "zip" (from source) extensions
-      if file.endswith(('.json', '.nii', '.nii.gz','.zip')):
-        size = os.path.getsize(full_path)
-        filename = os.path.relpath(full_path, path)
-        file_info.append({"path": filename, "contentbytesize": size})
+  if workers > 0:
+    file_info = []
+    subdirs, _ = _visit(path, "", file_info)
+    # below a handful of subtrees the pool costs more than it overlaps
+    if len(subdirs) > 4:
+      with ThreadPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(_walk, *zip(*subdirs)):
+          file_info.extend(part)
+    else:
+      for subdir, rel in subdirs:
+        file_info.extend(_walk(subdir, rel))
+  else:
+    file_info = list(iter_file_info(path))
     
   if savelist == 1:
     destination_path = os.path.join(path, "file_list.jsonl")
-    with open(destination_path, "w") as f:
+    # json.dumps takes the C encoder for compact output, json.dump never does
+    dumps = json.dumps
+    with open(destination_path, "w", buffering=1 << 20) as f:
       for item in file_info:
-        json.dump(item, f)
+        f.write(dumps(item))
         f.write("\n")  # Add newline after each JSON object
 
 
   return file_info
-
@@ -1,6 +1,9 @@
 import json
 import os
 
+# file lists produced on Windows carry backslash separators
+_PATH_TRANS = str.maketrans('\\', '/')
+
 def listjl2filetype(datasetjl, listjl, source_name, agent_name):
     # 1 - get datasetjl
     if not os.path.exists(datasetjl):
@@ -9,30 +12,42 @@ def listjl2filetype(datasetjl, listjl, source_name, agent_name):
     with open(datasetjl, 'r') as file:
         dataset_info = json.load(file)
     
-    local_jsonwrite(f"{dataset_info['name'].replace(' ', '')}.jsonl", dataset_info)
+    # open the output once and write every record through the same handle
+    filename = f"{dataset_info['name'].replace(' ', '')}.jsonl"
+    dumps = json.dumps
 
-    # 2 - get listjl
-    with open(listjl, 'r') as file:
-        files_info = file.readlines()
-    
-    # edit items and append
-    for file_info in files_info:
-        file_info_json = json.loads(file_info)
-        item = {
-            "type": "file",
-            "dataset_id": dataset_info["dataset_id"],
-            "dataset_version": dataset_info["dataset_version"],
-            "path": file_info_json["path"],
-            "contentbytesize": int(file_info_json["contentbytesize"]),
-            "metadata_sources": {
-                "sources": {
-                    "source_name": source_name,
-                    "source_version": dataset_info["dataset_version"],
-                    "agent_name": agent_name
-                }
-            }
+    # every file item is the same apart from path and size: build one item
+    # and only update those two fields (each item is serialised before the
+    # next one overwrites them)
+    item = {
+        "type": "file",
+        "dataset_id": dataset_info["dataset_id"],
+        "dataset_version": dataset_info["dataset_version"],
+        "path": None,
+        "contentbytesize": None,
+        "metadata_sources": {
+            "sources": [{
+                "source_name": source_name,
+                "source_version": dataset_info["dataset_version"],
+                "agent_name": agent_name
+            }]
         }
-        local_jsonwrite(f"{dataset_info['name'].replace(' ', '')}.jsonl", item)
+    }
+
+    with open(filename, 'a', buffering=1 << 20) as out, \
+            open(listjl, 'r', buffering=1 << 20) as file:
+        out.write(dumps(dataset_info, indent=4))
+        out.write('\n')
+
+        # 2 - get listjl, edit items and append (one line at a time)
+        for file_info in file:
+            if not file_info.strip():
+                continue
+            file_info_json = json.loads(file_info)
+            item["path"] = file_info_json["path"].translate(_PATH_TRANS)
+            item["contentbytesize"] = int(file_info_json["contentbytesize"])
+            out.write(dumps(item, indent=4))
+            out.write('\n')
 
 def local_jsonwrite(filename, json_obj):
     # Serialize a JSON (JavaScript Object Notation) structure